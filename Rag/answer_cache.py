@@ -0,0 +1,156 @@
+import math
+import operator
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_question(question):
+    return " ".join(question.lower().split())
+
+
+def normalize_vector(vector):
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else list(vector)
+
+
+def dot(a, b):
+    return sum(map(operator.mul, a, b))
+
+
+class CachedAnswer:
+    """Cached answer along with the IDs of the chunks it was built from"""
+
+    def __init__(self, question, embedding, answer, chunk_ids):
+        self.question = question
+        # Stored unit-length so the similarity tier is a plain dot product
+        self.embedding = normalize_vector(embedding)
+        self.answer = answer
+        self.chunk_ids = chunk_ids
+        self.created_at = time.monotonic()
+
+
+class AnswerCache:
+    """Per-document cache of RAG answers, shared by every session.
+
+    Two tiers: an exact match on the normalized question, then cosine
+    similarity between question embeddings above `similarity_threshold`.
+    A document's entries are dropped as soon as its index version changes.
+    Entries are evicted LRU beyond `max_entries` and expire after `ttl`
+    seconds.
+    """
+
+    def __init__(self, max_entries=1000, ttl=24 * 3600, similarity_threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        # doc_hash -> {normalized question -> CachedAnswer}
+        self._documents = {}
+        # (doc_hash, normalized question) in least recently used order
+        self._lru = OrderedDict()
+        self._index_versions = {}
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def get(self, doc_hash, index_version, question, embed_query):
+        """Look up an answer to `question`.
+
+        Returns `(entry, embedding)`. `embed_query` is only called when the
+        exact tier misses; the embedding is returned so the caller can reuse
+        it for chunk retrieval (None on an exact hit).
+        """
+        question_key = normalize_question(question)
+        with self._lock:
+            self._check_version(doc_hash, index_version)
+            entry = self._documents.get(doc_hash, {}).get(question_key)
+            if entry is not None:
+                if self._expired(entry):
+                    self._remove(doc_hash, question_key)
+                else:
+                    self._lru.move_to_end((doc_hash, question_key))
+                    self.exact_hits += 1
+                    return entry, None
+            candidates = list(self._documents.get(doc_hash, {}).items())
+
+        # Embedding is a network call and scoring is CPU bound: neither holds the lock
+        embedding = embed_query(question)
+        query = normalize_vector(embedding)
+        best_key, best_score = None, self.similarity_threshold
+        for candidate_key, candidate in candidates:
+            if self._expired(candidate):
+                continue
+            score = dot(query, candidate.embedding)
+            if score >= best_score:
+                best_key, best_score = candidate_key, score
+
+        with self._lock:
+            # The entry may have been evicted or invalidated while scoring
+            entry = None
+            if best_key is not None and self._index_versions.get(doc_hash) == index_version:
+                entry = self._documents.get(doc_hash, {}).get(best_key)
+            if entry is not None and self._expired(entry):
+                self._remove(doc_hash, best_key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, embedding
+            self._lru.move_to_end((doc_hash, best_key))
+            self.similar_hits += 1
+            return entry, embedding
+
+    def put(self, doc_hash, index_version, question, embedding, answer, chunk_ids):
+        question_key = normalize_question(question)
+        entry = CachedAnswer(question, embedding, answer, list(chunk_ids))
+        with self._lock:
+            self._check_version(doc_hash, index_version)
+            # Versions are only tracked for documents that have entries
+            self._index_versions[doc_hash] = index_version
+            self._documents.setdefault(doc_hash, {})[question_key] = entry
+            self._lru[(doc_hash, question_key)] = None
+            self._lru.move_to_end((doc_hash, question_key))
+            while len(self._lru) > self.max_entries:
+                self._remove(*next(iter(self._lru)))
+
+    def invalidate(self, doc_hash):
+        """Remove every answer of a document"""
+        with self._lock:
+            self._drop_document(doc_hash)
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hits": hits,
+                "lookups": lookups,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.monotonic() - entry.created_at > self.ttl
+
+    def _check_version(self, doc_hash, index_version):
+        # A re-indexed document gets new chunk IDs: its cached answers are stale
+        if self._index_versions.get(doc_hash, index_version) != index_version:
+            self._drop_document(doc_hash)
+
+    def _remove(self, doc_hash, question_key):
+        self._lru.pop((doc_hash, question_key), None)
+        entries = self._documents.get(doc_hash)
+        if entries is None:
+            return
+        entries.pop(question_key, None)
+        if not entries:
+            del self._documents[doc_hash]
+            self._index_versions.pop(doc_hash, None)
+
+    def _drop_document(self, doc_hash):
+        for question_key in self._documents.pop(doc_hash, {}):
+            self._lru.pop((doc_hash, question_key), None)
+        self._index_versions.pop(doc_hash, None)
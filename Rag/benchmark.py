@@ -0,0 +1,416 @@
+"""Offline benchmark for the PDF ingestion and retrieval pipeline.
+
+Runs without any Google API: a synthetic PDF corpus is generated locally and
+the Gemini embeddings / chat models are replaced by deterministic stand-ins.
+Each case reports ingest throughput, peak RSS, query latency and recall@k.
+
+Profiles reproduce each entry point's ingestion path: "chatbot" indexes page
+by page in small batches like the background IngestionJob, while
+"ingest_database" loads and splits the whole document and sends every chunk
+in a single add_documents call. Each profile uses its entry point's chunking,
+read from ingestion.py, unless --chunking crosses it with other settings.
+Backends are Chroma in memory, Chroma on disk (as both entry points use) and
+FAISS.
+
+    python benchmark.py --pages 50 200 --backends chroma chroma_persistent faiss
+    python benchmark.py --profiles chatbot --chunking 500:50 800:100 1000:0
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ingestion import (
+    IngestionJob,
+    DONE,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    DATABASE_CHUNK_SIZE,
+    DATABASE_CHUNK_OVERLAP,
+    document_hash,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Ingestion path and default (chunk_size, chunk_overlap) of each entry point
+PROFILES = {
+    "chatbot": {"whole_document": False, "chunking": (CHUNK_SIZE, CHUNK_OVERLAP)},
+    "ingest_database": {"whole_document": True, "chunking": (DATABASE_CHUNK_SIZE, DATABASE_CHUNK_OVERLAP)},
+}
+BACKENDS = ("chroma", "chroma_persistent", "faiss")
+
+EMBEDDING_DIM = 768  # same size as models/embedding-001
+
+FILLER_WORDS = (
+    "le contrat prevoit une clause de revision annuelle des loyers selon indice "
+    "du cout de la construction les charges locatives sont reparties entre "
+    "proprietaire et locataire au prorata des surfaces occupees le bailleur "
+    "doit assurer entretien des parties communes et la conformite des "
+    "installations electriques le preavis de depart est fixe a trois mois"
+).split()
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def page_fact(page_number):
+    """Unique fact of a page: (question, expected answer, sentence in the PDF)"""
+    rng = random.Random(page_number)
+    subject = f"dossier{page_number:05d}"
+    answer = f"REF{rng.randint(100000, 999999)}"
+    question = f"Quelle est la reference du {subject} ?"
+    sentence = f"La reference du {subject} est {answer}."
+    return question, answer, sentence
+
+
+def _escape_pdf_text(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(page_number, lines_per_page, words_per_line):
+    rng = random.Random(f"page-{page_number}")
+    lines = [
+        " ".join(rng.choice(FILLER_WORDS) for _ in range(words_per_line))
+        for _ in range(lines_per_page)
+    ]
+    # Place the answer somewhere inside the page so it is not always in the first chunk
+    lines.insert(rng.randrange(len(lines) + 1), page_fact(page_number)[2])
+    return lines
+
+
+def write_synthetic_pdf(path, num_pages, lines_per_page=40, words_per_line=12):
+    """Write a text PDF of `num_pages` pages, each holding one unique fact"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for page_number in range(1, num_pages + 1):
+        text = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in _page_lines(page_number, lines_per_page, words_per_line):
+            text.append(f"({_escape_pdf_text(line)}) Tj T*")
+        text.append("ET")
+        stream = "\n".join(text).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, num_pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                % (len(objects) + 1, xref_offset))
+
+
+def build_corpus(directory, page_counts):
+    """Generate one PDF per requested size and return {pages: path}"""
+    corpus = {}
+    for num_pages in page_counts:
+        path = os.path.join(directory, f"synthetic_{num_pages}p.pdf")
+        write_synthetic_pdf(path, num_pages)
+        corpus[num_pages] = path
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# Stand-in models
+# ---------------------------------------------------------------------------
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic hashed bag-of-words embeddings standing in for Gemini.
+
+    `latency_ms` simulates the network round trip of one API call.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, latency_ms=0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for token in set(re.findall(r"\w+", text.lower())):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _simulate_latency(self):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def embed_documents(self, texts):
+        self._simulate_latency()
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self._simulate_latency()
+        return self._embed(text)
+
+
+class EchoChatModel:
+    """Fake chat model returning the start of the prompt without any network call"""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+
+    def invoke(self, prompt):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return AIMessage(content=prompt[:200])
+
+
+# ---------------------------------------------------------------------------
+# Benchmark cases
+# ---------------------------------------------------------------------------
+
+class BenchmarkJob(IngestionJob):
+    """IngestionJob with a pluggable backend and an optional whole-document path"""
+
+    def __init__(self, client, embedding_function, backend="chroma", whole_document=False, **options):
+        super().__init__(client, embedding_function, **options)
+        self.backend = backend
+        self.whole_document = whole_document
+
+    def _create_vector_store(self):
+        if self.backend != "faiss":
+            return super()._create_vector_store()
+
+        import faiss
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        dim = len(self._embedding_function.embed_query("dimension"))
+        return FAISS(
+            embedding_function=self._embedding_function,
+            index=faiss.IndexFlatL2(dim),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+
+    def _index_pages(self):
+        if not self.whole_document:
+            return super()._index_pages()
+
+        # Same steps as ingest_database.py: load everything, split, one add_documents call
+        raw_documents = PyPDFLoader(self._pdf_path).load()
+        self.total_pages = len(raw_documents)
+        vector_store = self._create_vector_store()
+
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self._chunk_size,
+            chunk_overlap=self._chunk_overlap,
+            length_function=len,
+            is_separator_regex=False,
+        )
+        chunks = text_splitter.split_documents(raw_documents)
+        uuids = [str(uuid4()) for _ in range(len(chunks))]
+        for chunk, chunk_id in zip(chunks, uuids):
+            chunk.metadata["chunk_id"] = chunk_id
+        vector_store.add_documents(documents=chunks, ids=uuids)
+
+        self.vector_store = vector_store
+        self.chunks_indexed = len(chunks)
+        self.pages_indexed = self.total_pages
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def parse_chunking(value):
+    """Parse a "size:overlap" command line value"""
+    try:
+        chunk_size, chunk_overlap = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected size:overlap, got {value!r}")
+    if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+        raise argparse.ArgumentTypeError(f"overlap must be in [0, size) and size positive: {value!r}")
+    return chunk_size, chunk_overlap
+
+
+def run_case(pdf_path, num_pages, profile, chunking, backend, k, num_queries,
+             embed_latency_ms, llm_latency_ms):
+    """Ingest the PDF then time the queries; runs in a dedicated process"""
+    embeddings = HashingEmbeddings(latency_ms=embed_latency_ms)
+    llm = EchoChatModel(latency_ms=llm_latency_ms)
+
+    # IngestionJob deletes its input file once done
+    fd, job_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    shutil.copyfile(pdf_path, job_path)
+
+    with open(pdf_path, "rb") as f:
+        doc_hash = document_hash(f.read())
+    chunk_size, chunk_overlap = chunking
+    options = dict(doc_hash=doc_hash, file_name=os.path.basename(pdf_path), pdf_path=job_path,
+                   chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                   whole_document=PROFILES[profile]["whole_document"])
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as chroma_path:
+        client = None
+        if backend == "chroma":
+            import chromadb
+            client = chromadb.EphemeralClient()
+        elif backend == "chroma_persistent":
+            import chromadb
+            client = chromadb.PersistentClient(path=chroma_path)
+        job = BenchmarkJob(client, embeddings, backend=backend, **options)
+
+        start = time.perf_counter()
+        job.run()
+        ingest_seconds = time.perf_counter() - start
+        return _measure_queries(job, embeddings, llm, num_pages, profile, chunking, backend, k,
+                                num_queries, ingest_seconds)
+
+
+def _measure_queries(job, embeddings, llm, num_pages, profile, chunking, backend, k,
+                     num_queries, ingest_seconds):
+    if job.status != DONE:
+        raise RuntimeError(f"ingestion {job.status}: {job.error}")
+
+    retriever = job.vector_store.as_retriever(search_kwargs={'k': k})
+    rng = random.Random(0)
+    pages = [rng.randint(1, num_pages) for _ in range(num_queries)]
+    latencies = []
+    hits = 0
+    for page_number in pages:
+        question, answer, _ = page_fact(page_number)
+        start = time.perf_counter()
+        docs = retriever.invoke(question)
+        knowledge = "\n\n".join([doc.page_content for doc in docs])
+        llm.invoke(f"Question: {question}\nInformations: {knowledge}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Known answer chunks are the ones holding the page's reference
+        if any(answer in doc.page_content for doc in docs):
+            hits += 1
+
+    return {
+        "pages": num_pages,
+        "profile": profile,
+        "chunking": "%d:%d" % chunking,
+        "backend": backend,
+        "chunks": job.chunks_indexed,
+        "ingest_seconds": ingest_seconds,
+        "pages_per_sec": num_pages / ingest_seconds if ingest_seconds else float("inf"),
+        "embedding_calls": embeddings.calls,
+        "peak_rss_mb": _peak_rss_mb(),
+        "query_p50_ms": statistics.median(latencies),
+        "query_p95_ms": _percentile(latencies, 95),
+        f"recall@{k}": hits / len(pages),
+    }
+
+
+def _run_isolated(args):
+    # A fresh process per case keeps ru_maxrss specific to that case
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_case, args)
+
+
+def format_table(results, k):
+    columns = [
+        ("pages", "pages", "{}"),
+        ("profile", "profile", "{}"),
+        ("chunking", "chunking", "{}"),
+        ("backend", "backend", "{}"),
+        ("chunks", "chunks", "{}"),
+        ("pages_per_sec", "pages/s", "{:.1f}"),
+        ("peak_rss_mb", "peak RSS MB", "{:.0f}"),
+        ("query_p50_ms", "p50 ms", "{:.2f}"),
+        ("query_p95_ms", "p95 ms", "{:.2f}"),
+        (f"recall@{k}", f"recall@{k}", "{:.2f}"),
+    ]
+    rows = [[title for _, title, _ in columns]]
+    for result in results:
+        rows.append([
+            "n/a" if result[key] is None else fmt.format(result[key])
+            for key, _, fmt in columns
+        ])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    lines = ["  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200],
+                        help="page counts of the synthetic PDFs")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument("--chunking", type=parse_chunking, nargs="+", metavar="SIZE:OVERLAP",
+                        help="chunk settings run with every profile (default: each profile's own)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("-k", type=int, default=3, help="retrieved chunks per query")
+    parser.add_argument("--queries", type=int, default=100, help="queries per case")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0,
+                        help="simulated latency of each embedding API call")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="simulated latency of each chat model call")
+    parser.add_argument("--json", help="also write the raw results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = build_corpus(corpus_dir, args.pages)
+        for num_pages, pdf_path in corpus.items():
+            for profile in args.profiles:
+                for chunking in args.chunking or [PROFILES[profile]["chunking"]]:
+                    for backend in args.backends:
+                        results.append(_run_isolated((
+                            pdf_path, num_pages, profile, chunking, backend, args.k,
+                            args.queries, args.embed_latency_ms, args.llm_latency_ms,
+                        )))
+
+    print(format_table(results, args.k))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,23 +9,25 @@ st.set_page_config(
 )
 
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
 import google.generativeai as genai
 import os
-from pathlib import Path
-import tempfile
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from uuid import uuid4
 from dotenv import load_dotenv
 import chromadb
 import time
+from ingestion import IngestionManager, DONE, FAILED
+from answer_cache import AnswerCache
 
 # import the .env file
 load_dotenv()
 
 # configuration
 CHROMA_PATH = "chroma_db"
+ANSWER_CACHE_SIZE = 1000
+ANSWER_CACHE_TTL = 24 * 3600  # seconds
+ANSWER_CACHE_SIMILARITY = 0.95  # minimum cosine similarity between questions
+
+INDEXING_MESSAGE = "⏳ Indexation en cours, vous pourrez poser vos questions dès les premières pages traitées."
 
 # Configure Google Gemini
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
@@ -47,71 +49,48 @@ llm = ChatGoogleGenerativeAI(
     google_api_key=GOOGLE_API_KEY
 )
 
-def process_pdf(pdf_file):
-    """Process uploaded PDF file and add to vector store"""
-    try:
-        # Save uploaded file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(pdf_file.getvalue())
-            tmp_path = tmp_file.name
-
-        # Load and split PDF with optimized chunk size
-        loader = PyPDFLoader(tmp_path)
-        raw_documents = loader.load()
-        
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,  # Increased chunk size
-            chunk_overlap=50,  # Reduced overlap
-            length_function=len,
-            is_separator_regex=False,
-        )
-        chunks = text_splitter.split_documents(raw_documents)
-        
-        if not chunks:
-            return False, "❌ Le PDF semble être vide ou illisible"
-            
-        # Generate UUIDs
-        uuids = [str(uuid4()) for _ in range(len(chunks))]
-        
-        # Reset collection
-        try:
-            chroma_client.delete_collection(name="example_collection")
-        except:
-            pass
-            
-        # Create new collection and vector store
-        collection = chroma_client.create_collection(name="example_collection")
-        vector_store = Chroma(
-            client=chroma_client,
-            collection_name="example_collection",
-            embedding_function=embeddings_model,
-        )
-        
-        # Add documents in batches
-        batch_size = 5
-        for i in range(0, len(chunks), batch_size):
-            batch_end = min(i + batch_size, len(chunks))
-            vector_store.add_documents(
-                documents=chunks[i:batch_end],
-                ids=uuids[i:batch_end]
-            )
-        
-        # Cleanup and save
-        os.unlink(tmp_path)
-        st.session_state.vector_store = vector_store
-        return True, f"✅ PDF traité avec succès! ({len(chunks)} segments créés)"
-        
-    except Exception as e:
-        return False, f"❌ Erreur: {str(e)}"
+@st.cache_resource
+def get_ingestion_manager():
+    """Background ingestion workers shared by every session"""
+    return IngestionManager(client=chroma_client, embedding_function=embeddings_model)
+
+ingestion_manager = get_ingestion_manager()
+
+@st.cache_resource
+def get_answer_cache():
+    """Answers shared by every session, keyed by document and question"""
+    return AnswerCache(
+        max_entries=ANSWER_CACHE_SIZE,
+        ttl=ANSWER_CACHE_TTL,
+        similarity_threshold=ANSWER_CACHE_SIMILARITY,
+    )
+
+answer_cache = get_answer_cache()
+
+def get_current_job():
+    return ingestion_manager.get(st.session_state.session_id)
 
 def get_chat_response(message, history):
     try:
-        if 'vector_store' not in st.session_state:
+        job = get_current_job()
+        if job is None or not job.queryable:
+            if job is not None and job.active:
+                return INDEXING_MESSAGE
             return "⚠️ Veuillez d'abord télécharger un fichier PDF!"
             
-        # Get relevant chunks with smaller k
-        retriever = st.session_state.vector_store.as_retriever(search_kwargs={'k': 3})
-        docs = retriever.invoke(message)
+        # Only cache answers built from the complete index
+        use_cache = job.status == DONE
+        if use_cache:
+            cached, query_embedding = answer_cache.get(
+                job.doc_hash, job.index_version, message, embeddings_model.embed_query
+            )
+            if cached is not None:
+                return cached.answer
+        else:
+            query_embedding = embeddings_model.embed_query(message)
+            
+        # Get relevant chunks with smaller k (only pages indexed so far while ingestion runs)
+        docs = job.vector_store.similarity_search_by_vector(query_embedding, k=3)
         
         if not docs:
             return "Je ne trouve pas d'information pertinente dans le document pour répondre à cette question."
@@ -127,6 +106,17 @@ def get_chat_response(message, history):
         """
         
         response = llm.invoke(rag_prompt)
+        # The document may have been evicted and re-indexed during the generation:
+        # caching under the old version would wipe the new one's answers
+        if use_cache and get_current_job() is job:
+            # The answer is already paid for: a caching failure must not replace it
+            try:
+                answer_cache.put(
+                    job.doc_hash, job.index_version, message, query_embedding,
+                    response.content, [doc.metadata.get("chunk_id") for doc in docs]
+                )
+            except Exception:
+                pass
         return response.content
                 
     except Exception as e:
@@ -135,8 +125,8 @@ def get_chat_response(message, history):
 # Initialize session states
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
-if 'processing' not in st.session_state:
-    st.session_state.processing = False
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = str(uuid4())
 if 'last_uploaded_file' not in st.session_state:
     st.session_state.last_uploaded_file = None
 
@@ -145,17 +135,34 @@ with st.sidebar:
     st.title("📚 Assistant PDF")
     uploaded_file = st.file_uploader("Importer un PDF", type=['pdf'])
     
-    if uploaded_file and (st.session_state.last_uploaded_file != uploaded_file.name or not st.session_state.processing):
-        st.session_state.processing = True
-        st.session_state.last_uploaded_file = uploaded_file.name
-        
-        with st.spinner("Traitement du document..."):
-            success, message = process_pdf(uploaded_file)
-            if success:
-                st.success(message)
+    # Uploading a different file cancels the previous ingestion job; file_id changes on
+    # every upload, so a revised file or a retry after a failure is always resubmitted
+    if uploaded_file and (st.session_state.last_uploaded_file != uploaded_file.file_id or get_current_job() is None):
+        st.session_state.last_uploaded_file = uploaded_file.file_id
+        ingestion_manager.submit(st.session_state.session_id, uploaded_file.name, uploaded_file.getvalue())
+    
+    job = get_current_job()
+    if job is not None:
+        if job.active:
+            st.progress(
+                job.progress,
+                text=f"Traitement du document... ({job.pages_indexed}/{job.total_pages or '?'} pages)"
+            )
+            if job.queryable:
+                st.caption("Vous pouvez déjà poser des questions sur les pages indexées.")
             else:
-                st.error(message)
-        st.session_state.processing = False
+                st.caption(INDEXING_MESSAGE)
+        elif job.status == DONE:
+            st.success(f"✅ PDF traité avec succès! ({job.chunks_indexed} segments créés)")
+        elif job.status == FAILED:
+            st.error(f"❌ Erreur: {job.error}")
+    
+    cache_stats = answer_cache.stats()
+    if cache_stats["lookups"]:
+        st.caption(
+            f"Cache des réponses : {cache_stats['hit_rate']:.0%} de succès "
+            f"({cache_stats['hits']}/{cache_stats['lookups']})"
+        )
     
     if st.session_state.chat_history:
         if st.button("🗑️ Effacer la conversation"):
@@ -168,7 +175,10 @@ for message in st.session_state.chat_history:
         st.write(message["content"])
 
 if user_input := st.chat_input("Posez votre question..."):
-    if 'vector_store' not in st.session_state:
+    job = get_current_job()
+    if job is not None and job.active and not job.queryable:
+        st.info(INDEXING_MESSAGE)
+    elif job is None or not job.queryable:
         st.error("⚠️ Veuillez d'abord importer un document PDF")
     else:
         st.session_state.chat_history.append({"role": "user", "content": user_input})
@@ -177,4 +187,10 @@ if user_input := st.chat_input("Posez votre question..."):
             with st.spinner("Recherche..."):
                 response = get_chat_response(user_input, st.session_state.chat_history)
                 st.write(response)
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
\ No newline at end of file
+                st.session_state.chat_history.append({"role": "assistant", "content": response})
+
+# Refresh the sidebar progress while the background job is running
+job = get_current_job()
+if job is not None and job.active:
+    time.sleep(1)
+    st.rerun()
@@ -3,6 +3,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_chroma import Chroma
 from uuid import uuid4
+from ingestion import DATABASE_CHUNK_SIZE, DATABASE_CHUNK_OVERLAP
 import google.generativeai as genai
 import os
 
@@ -38,8 +39,8 @@ raw_documents = loader.load()
 
 # splitting the document
 text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=300,
-    chunk_overlap=100,
+    chunk_size=DATABASE_CHUNK_SIZE,
+    chunk_overlap=DATABASE_CHUNK_OVERLAP,
     length_function=len,
     is_separator_regex=False,
 )
@@ -0,0 +1,287 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from langchain_chroma import Chroma
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+# Prefix of the Chroma collections owned by the ingestion jobs
+COLLECTION_PREFIX = "pdf_"
+
+# Chunking of PDFs uploaded to the chatbot
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+BATCH_SIZE = 5
+
+# Chunking of the batch indexing script (ingest_database.py)
+DATABASE_CHUNK_SIZE = 300
+DATABASE_CHUNK_OVERLAP = 100
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+def document_hash(data):
+    """SHA-256 fingerprint of a document's content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class IngestionJob:
+    """Index a PDF page by page into its own Chroma collection.
+
+    Pages are processed in document order and each one can be queried as
+    soon as its chunks are in the vector store, before the whole document
+    is done.
+    """
+
+    def __init__(self, client, embedding_function, doc_hash, file_name, pdf_path,
+                 chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, batch_size=BATCH_SIZE,
+                 previous=None):
+        self.doc_hash = doc_hash
+        self.file_name = file_name
+        self.collection_name = f"{COLLECTION_PREFIX}{doc_hash[:32]}"
+        # Changes every time the document is (re)indexed
+        self.index_version = str(uuid4())
+        self.status = QUEUED
+        self.error = None
+        self.total_pages = 0
+        self.pages_indexed = 0
+        self.chunks_indexed = 0
+        self.subscribers = set()
+        self.future = None
+
+        self._client = client
+        self._embedding_function = embedding_function
+        self._pdf_path = pdf_path
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._batch_size = batch_size
+        # A cancelled job on the same document must stop writing before we reset its collection
+        self._previous = previous
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self.vector_store = None
+
+    @property
+    def progress(self):
+        if not self.total_pages:
+            return 0.0
+        return self.pages_indexed / self.total_pages
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def queryable(self):
+        return self.vector_store is not None and self.chunks_indexed > 0
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def run(self):
+        try:
+            if self._previous is not None:
+                self._previous.wait()
+                self._previous = None
+            if self._cancel.is_set():
+                self.status = CANCELLED
+                return
+            self.status = RUNNING
+            self._index_pages()
+            if self._cancel.is_set():
+                self.status = CANCELLED
+            elif not self.chunks_indexed:
+                self.status = FAILED
+                self.error = "Le PDF semble être vide ou illisible"
+            else:
+                self.status = DONE
+        except Exception as e:
+            self.status = FAILED
+            self.error = str(e)
+        finally:
+            try:
+                os.unlink(self._pdf_path)
+            except OSError:
+                pass
+            self._done.set()
+
+    def delete_vector_store(self):
+        """Drop the collection; only call once the job has stopped"""
+        self.vector_store = None
+        try:
+            self._client.delete_collection(name=self.collection_name)
+        except Exception:
+            pass
+
+    def _create_vector_store(self):
+        # Reset collection
+        self.delete_vector_store()
+        return Chroma(
+            client=self._client,
+            collection_name=self.collection_name,
+            embedding_function=self._embedding_function,
+        )
+
+    def _index_pages(self):
+        self.total_pages = len(PdfReader(self._pdf_path).pages)
+
+        vector_store = self._create_vector_store()
+        self.vector_store = vector_store
+
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self._chunk_size,
+            chunk_overlap=self._chunk_overlap,
+            length_function=len,
+            is_separator_regex=False,
+        )
+
+        # lazy_load yields pages in document order
+        for page in PyPDFLoader(self._pdf_path).lazy_load():
+            if self._cancel.is_set():
+                return
+            chunks = text_splitter.split_documents([page])
+            for i in range(0, len(chunks), self._batch_size):
+                if self._cancel.is_set():
+                    return
+                batch = chunks[i:i + self._batch_size]
+                ids = [str(uuid4()) for _ in batch]
+                # Kept in metadata too: Document.id is missing from older langchain-core
+                for chunk, chunk_id in zip(batch, ids):
+                    chunk.metadata["chunk_id"] = chunk_id
+                vector_store.add_documents(documents=batch, ids=ids)
+                self.chunks_indexed += len(batch)
+            self.pages_indexed += 1
+
+
+class IngestionManager:
+    """Worker pool shared by every session for PDF ingestion.
+
+    A document is indexed once: sessions uploading the same content join the
+    existing job. A job is cancelled and its collection dropped as soon as no
+    session uses it, and at most `max_documents` jobs are kept, the least
+    recently used ones being evicted first.
+    """
+
+    def __init__(self, client, embedding_function, max_workers=2, max_documents=8, **job_options):
+        self._client = client
+        self._embedding_function = embedding_function
+        self._max_documents = max_documents
+        self._job_options = job_options
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-ingest")
+        # Re-entrant: a finished job's done callback runs in the caller's thread
+        self._lock = threading.RLock()
+        self._jobs = OrderedDict()
+        self._sessions = {}
+        self._drop_orphaned_collections()
+
+    def submit(self, session_id, file_name, data):
+        """Start (or join) the ingestion of `data` for the given session"""
+        doc_hash = document_hash(data)
+        with self._lock:
+            current = self._sessions.get(session_id)
+            if current is not None and current != doc_hash:
+                self._detach(session_id, current)
+
+            previous = self._jobs.get(doc_hash)
+            job = previous
+            if job is not None and (job.cancelled or job.status == FAILED):
+                job = None
+            if job is None:
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+                    tmp_file.write(data)
+                    tmp_path = tmp_file.name
+                job = IngestionJob(
+                    self._client,
+                    self._embedding_function,
+                    doc_hash,
+                    file_name,
+                    tmp_path,
+                    previous=previous,
+                    **self._job_options,
+                )
+                if previous is not None:
+                    # Sessions still mapped to the replaced job now use this one
+                    job.subscribers.update(previous.subscribers)
+                    previous.subscribers.clear()
+                self._jobs[doc_hash] = job
+                job.future = self._executor.submit(job.run)
+
+            job.subscribers.add(session_id)
+            self._sessions[session_id] = doc_hash
+            self._jobs.move_to_end(doc_hash)
+            self._evict()
+            return job
+
+    def get(self, session_id):
+        """Current job of the session, or None"""
+        with self._lock:
+            doc_hash = self._sessions.get(session_id)
+            job = self._jobs.get(doc_hash) if doc_hash else None
+            if job is not None:
+                self._jobs.move_to_end(doc_hash)
+            return job
+
+    def _detach(self, session_id, doc_hash):
+        job = self._jobs.get(doc_hash)
+        if job is None:
+            return
+        job.subscribers.discard(session_id)
+        if not job.subscribers:
+            self._retire(job)
+
+    def _evict(self):
+        # Sessions never say goodbye, so unused jobs are also bounded by count.
+        # Jobs stay registered until they stop, so a re-upload still waits for them.
+        excess = len(self._jobs) - self._max_documents
+        for job in list(self._jobs.values())[:max(excess, 0)]:
+            for session_id in job.subscribers:
+                self._sessions.pop(session_id, None)
+            job.subscribers.clear()
+            self._retire(job)
+
+    def _retire(self, job):
+        if job.cancelled:
+            return
+        job.cancel()
+        job.future.add_done_callback(lambda _: self._release(job))
+
+    def _release(self, job):
+        with self._lock:
+            # The document may have been uploaded again in the meantime
+            if job.subscribers:
+                return
+            current = self._jobs.get(job.doc_hash)
+            if current is job:
+                del self._jobs[job.doc_hash]
+            elif current is not None:
+                # A newer job owns the collection and resets it itself
+                return
+            job.delete_vector_store()
+
+    def _drop_orphaned_collections(self):
+        # Collections left on disk by a previous process are unreachable
+        for collection in self._client.list_collections():
+            name = getattr(collection, "name", collection)
+            if name.startswith(COLLECTION_PREFIX):
+                try:
+                    self._client.delete_collection(name=name)
+                except Exception:
+                    pass
@@ -0,0 +1,133 @@
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache
+
+EMBEDDINGS = {
+    "quel est le loyer ?": [1.0, 0.0, 0.0],
+    "quel est le montant du loyer ?": [0.98, 0.2, 0.0],
+    "qui est le bailleur ?": [0.0, 1.0, 0.0],
+    "quelle est la duree du preavis ?": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, question):
+        self.calls += 1
+        return EMBEDDINGS[question.lower().strip()]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def store(cache, question, doc_hash="doc", index_version="v1", answer=None):
+    cache.put(doc_hash, index_version, question, EMBEDDINGS[question],
+              answer or f"réponse à {question}", ["chunk-1", "chunk-2"])
+
+
+def test_exact_hit_skips_embedding():
+    cache = AnswerCache()
+    embeddings = FakeEmbeddings()
+    store(cache, "quel est le loyer ?")
+
+    entry, embedding = cache.get("doc", "v1", "  Quel est le   LOYER ? ", embeddings.embed_query)
+
+    assert entry.answer == "réponse à quel est le loyer ?"
+    assert entry.chunk_ids == ["chunk-1", "chunk-2"]
+    assert embedding is None
+    assert embeddings.calls == 0
+
+
+def test_similar_hit_above_threshold():
+    cache = AnswerCache(similarity_threshold=0.95)
+    embeddings = FakeEmbeddings()
+    store(cache, "quel est le loyer ?")
+
+    entry, embedding = cache.get("doc", "v1", "quel est le montant du loyer ?", embeddings.embed_query)
+    assert entry.question == "quel est le loyer ?"
+    assert embedding == EMBEDDINGS["quel est le montant du loyer ?"]
+
+    entry, embedding = cache.get("doc", "v1", "qui est le bailleur ?", embeddings.embed_query)
+    assert entry is None
+    assert embedding == EMBEDDINGS["qui est le bailleur ?"]
+
+
+def test_answers_are_per_document():
+    cache = AnswerCache()
+    store(cache, "quel est le loyer ?", doc_hash="a")
+
+    entry, _ = cache.get("b", "v1", "quel est le loyer ?", FakeEmbeddings().embed_query)
+
+    assert entry is None
+
+
+def test_ttl_expiry(clock):
+    cache = AnswerCache(ttl=60)
+    store(cache, "quel est le loyer ?")
+
+    clock[0] += 59
+    assert cache.get("doc", "v1", "quel est le loyer ?", FakeEmbeddings().embed_query)[0] is not None
+
+    clock[0] += 2
+    assert cache.get("doc", "v1", "quel est le loyer ?", FakeEmbeddings().embed_query)[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_at_max_entries():
+    cache = AnswerCache(max_entries=2)
+    embeddings = FakeEmbeddings()
+    store(cache, "quel est le loyer ?")
+    store(cache, "qui est le bailleur ?")
+    # Touch the oldest entry so the bailleur answer becomes least recently used
+    cache.get("doc", "v1", "quel est le loyer ?", embeddings.embed_query)
+    store(cache, "quelle est la duree du preavis ?")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("doc", "v1", "qui est le bailleur ?", embeddings.embed_query)[0] is None
+    assert cache.get("doc", "v1", "quel est le loyer ?", embeddings.embed_query)[0] is not None
+
+
+def test_new_index_version_invalidates_document():
+    cache = AnswerCache()
+    store(cache, "quel est le loyer ?", doc_hash="a")
+    store(cache, "quel est le loyer ?", doc_hash="b")
+
+    entry, _ = cache.get("a", "v2", "quel est le loyer ?", FakeEmbeddings().embed_query)
+
+    assert entry is None
+    assert cache.stats()["entries"] == 1
+    assert cache.get("b", "v1", "quel est le loyer ?", FakeEmbeddings().embed_query)[0] is not None
+
+
+def test_versions_are_pruned_with_their_entries():
+    cache = AnswerCache(max_entries=1)
+    store(cache, "quel est le loyer ?", doc_hash="a")
+    store(cache, "quel est le loyer ?", doc_hash="b")
+    cache.get("c", "v1", "quel est le loyer ?", FakeEmbeddings().embed_query)
+
+    assert set(cache._index_versions) == {"b"}
+
+
+def test_hit_rate_counters():
+    cache = AnswerCache()
+    embeddings = FakeEmbeddings()
+    store(cache, "quel est le loyer ?")
+
+    cache.get("doc", "v1", "quel est le loyer ?", embeddings.embed_query)
+    cache.get("doc", "v1", "quel est le montant du loyer ?", embeddings.embed_query)
+    cache.get("doc", "v1", "qui est le bailleur ?", embeddings.embed_query)
+    cache.get("doc", "v1", "quelle est la duree du preavis ?", embeddings.embed_query)
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1
+    assert stats["similar_hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["lookups"] == 4
+    assert stats["hit_rate"] == 0.5
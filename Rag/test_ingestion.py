@@ -0,0 +1,170 @@
+import threading
+import time
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+pytest.importorskip("langchain_chroma")
+
+from benchmark import HashingEmbeddings, write_synthetic_pdf
+from ingestion import IngestionManager, QUEUED, DONE, FAILED
+
+
+class FlakyEmbeddings(HashingEmbeddings):
+    """Fails the first document batch, like a transient API error"""
+
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    def embed_documents(self, texts):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError("quota exceeded")
+        return super().embed_documents(texts)
+
+
+class GatedEmbeddings(HashingEmbeddings):
+    """Blocks every document batch after the first `open_batches` until released"""
+
+    def __init__(self, open_batches=1):
+        super().__init__()
+        self.open_batches = open_batches
+        self.batches = 0
+        self.released = threading.Event()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches += 1
+            blocked = self.batches > self.open_batches
+        if blocked:
+            self.released.wait(10)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def client():
+    return chromadb.EphemeralClient()
+
+
+@pytest.fixture
+def pdf_bytes(tmp_path):
+    def make(num_pages):
+        path = tmp_path / f"doc_{num_pages}.pdf"
+        write_synthetic_pdf(str(path), num_pages)
+        return path.read_bytes()
+    return make
+
+
+def wait_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+def collection_names(client):
+    return {getattr(collection, "name", collection) for collection in client.list_collections()}
+
+
+def test_failed_job_retry_keeps_other_sessions_subscribed(client, pdf_bytes):
+    manager = IngestionManager(client, FlakyEmbeddings())
+    document = pdf_bytes(3)
+
+    failed = manager.submit("s1", "a.pdf", document)
+    assert manager.submit("s2", "a.pdf", document) is failed
+    failed.wait(10)
+    assert failed.status == FAILED
+
+    retry = manager.submit("s3", "a.pdf", document)
+    retry.wait(10)
+    assert retry.status == DONE
+    assert manager.get("s1") is retry
+    assert retry.subscribers == {"s1", "s2", "s3"}
+
+    manager.submit("s3", "b.pdf", pdf_bytes(2))
+
+    assert not retry.cancelled
+    assert manager.get("s1") is retry
+    assert retry.collection_name in collection_names(client)
+
+
+def test_job_is_queryable_before_done(client, pdf_bytes):
+    embeddings = GatedEmbeddings(open_batches=2)
+    manager = IngestionManager(client, embeddings, batch_size=100)
+    try:
+        job = manager.submit("s1", "a.pdf", pdf_bytes(5))
+        wait_until(lambda: embeddings.batches > 2)
+
+        assert job.status != DONE
+        assert job.queryable
+        assert job.pages_indexed == 2
+        # Pages are indexed in document order
+        docs = job.vector_store.similarity_search("reference dossier", k=20)
+        assert {doc.metadata["page"] for doc in docs} == {0, 1}
+    finally:
+        embeddings.released.set()
+    job.wait(10)
+    assert job.status == DONE
+    assert job.pages_indexed == 5
+
+
+def test_switching_file_cancels_job_and_drops_collection(client, pdf_bytes):
+    embeddings = GatedEmbeddings()
+    manager = IngestionManager(client, embeddings, max_workers=3)
+    try:
+        first = manager.submit("s1", "a.pdf", pdf_bytes(5))
+        wait_until(lambda: first.queryable)
+        second = manager.submit("s1", "b.pdf", pdf_bytes(2))
+        assert first.cancelled
+        assert manager.get("s1") is second
+
+        # Uploading the first document again waits for the cancelled job to stop
+        again = manager.submit("s2", "a.pdf", pdf_bytes(5))
+        assert again is not first
+        time.sleep(0.2)
+        assert again.status == QUEUED
+    finally:
+        embeddings.released.set()
+
+    first.wait(10)
+    again.wait(10)
+    assert again.status == DONE
+    assert again.collection_name in collection_names(client)
+
+    manager.submit("s2", "b.pdf", pdf_bytes(2))
+    wait_until(lambda: again.collection_name not in collection_names(client))
+
+
+def test_same_content_shares_one_job(client, pdf_bytes):
+    manager = IngestionManager(client, HashingEmbeddings())
+    document = pdf_bytes(3)
+
+    job = manager.submit("s1", "a.pdf", document)
+    assert manager.submit("s2", "copy.pdf", document) is job
+    job.wait(10)
+
+    manager.submit("s1", "b.pdf", pdf_bytes(2))
+    assert not job.cancelled
+    assert manager.get("s2") is job
+    assert job.collection_name in collection_names(client)
+
+
+def test_least_recently_used_document_is_evicted(client, pdf_bytes):
+    manager = IngestionManager(client, HashingEmbeddings(), max_documents=2)
+    first = manager.submit("s1", "a.pdf", pdf_bytes(1))
+    second = manager.submit("s2", "b.pdf", pdf_bytes(2))
+    first.wait(10)
+    second.wait(10)
+    # s1 used its document last, so s2's is the one to go
+    manager.get("s1")
+
+    third = manager.submit("s3", "c.pdf", pdf_bytes(3))
+    third.wait(10)
+
+    assert manager.get("s2") is None
+    assert manager.get("s1") is first
+    wait_until(lambda: second.collection_name not in collection_names(client))
+    assert first.collection_name in collection_names(client)